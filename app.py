@@ -2,15 +2,19 @@ import os
 
 from flask import Flask, jsonify, render_template, request, flash, redirect, session, g
 from flask_debugtoolbar import DebugToolbarExtension
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 
+import click
 import requests
 import random
 import statistics
 from statistics import mode
 
-from models import db, connect_db, User, RecentlyViewedDrink, RecentlyViewedIngredient, UserDrink, UserIngredient, Original
+from models import db, connect_db, User, RecentlyViewedDrink, RecentlyViewedIngredient, UserDrink, UserIngredient, Original, Drink, Ingredient, DrinkIngredient
 from forms import UserAddForm, LoginForm, UpdateUserForm, NewOriginalForm, UpdateUserForm
+from cache import TwoTierCache
+from catalog import sync_catalog, catalog_ready
+from batch import FanOut
 
 CURR_USER_KEY = "curr_user"
 
@@ -29,9 +33,27 @@ app.config['DEBUG_TB_INTERCEPT_REDIRECTS'] = False
 app.config['EXPLAIN_TAMPLATE_LOADING'] = True
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'super_secret')
 
+# TheCocktailDB response cache: per-process LRU size, shared table row cap,
+# and per-endpoint TTL overrides in seconds (see cache.DEFAULT_TTLS).
+app.config['API_CACHE_SIZE'] = int(os.environ.get('API_CACHE_SIZE', 1024))
+app.config['API_CACHE_DB_MAX_ROWS'] = int(
+    os.environ.get('API_CACHE_DB_MAX_ROWS', 20000))
+app.config['API_CACHE_TTLS'] = {}
+
+# Most upstream requests one worker may have in flight at once when
+# fetching several drinks or ingredients for a page.
+app.config['API_MAX_CONCURRENCY'] = int(
+    os.environ.get('API_MAX_CONCURRENCY', 8))
+
 toolbar = DebugToolbarExtension(app)
 
 connect_db(app)
+
+api_cache = TwoTierCache(max_size=app.config['API_CACHE_SIZE'],
+                         ttls=app.config['API_CACHE_TTLS'],
+                         db_max_rows=app.config['API_CACHE_DB_MAX_ROWS'])
+
+fanout = FanOut(max_workers=app.config['API_MAX_CONCURRENCY'])
  
 
 @app.before_request
@@ -440,6 +462,21 @@ API_BASE_URL = "http://www.thecocktaildb.com/api/json/v1/1/"
 def get_drinks_by_name(name):
     """Look up a list of drinks by name"""
 
+    if catalog_ready():
+        drinks = (Drink
+                  .query
+                  .filter(Drink.name.ilike(f"%{name}%"))
+                  .order_by(Drink.name)
+                  .all())
+        return [d.data for d in drinks] or None
+
+    return search_drinks(name)
+
+
+@api_cache.cached('search')
+def search_drinks(name):
+    """API call to search drinks by name"""
+
     res = requests.get(f"{API_BASE_URL}search.php?s={name}")
     return res.json()['drinks']
 
@@ -448,19 +485,56 @@ def get_drink_by_id(idDrink):
     """Look up full cocktail details by id"""
 
     if idDrink:
-        resp = requests.get(f"{API_BASE_URL}lookup.php?i={idDrink}")
-        return resp.json()['drinks'][0]
+        drink = Drink.query.get(int(idDrink))
+        return drink.data if drink else lookup_drink(idDrink)
 
     else:
         return None
 
 
+def get_drinks_by_ids(ids):
+    """Look up full cocktail details for many ids at once, keeping their order"""
+
+    ids = [int(i) for i in ids if i]
+    if not ids:
+        return []
+
+    found = {d.id: d.data for d in Drink.query.filter(Drink.id.in_(ids))}
+    found.update(fetch_many('lookup', lookup_drink,
+                            [i for i in ids if i not in found]))
+
+    return [found[i] for i in ids if i in found]
+
+
+@api_cache.cached('lookup')
+def lookup_drink(idDrink):
+    """API call for full cocktail details by id"""
+
+    resp = requests.get(f"{API_BASE_URL}lookup.php?i={idDrink}")
+    return resp.json()['drinks'][0]
+
+
+@api_cache.cached('list')
+def list_ingredients(kind):
+    """API call for one of the list.php catalogs"""
+
+    resp = requests.get(f"{API_BASE_URL}list.php?{kind}=list")
+    return resp.json()['drinks']
+
+
 def get_all_ingredients():
-    """API call to get all ingredients"""
+    """Get the names of all ingredients"""
+
+    try:
+        names = [name for (name,) in
+                 db.session.query(Ingredient.name).order_by(Ingredient.name)]
 
-    resp = requests.get(f"{API_BASE_URL}list.php?i=list")
+    except SQLAlchemyError:
+        # Tables not created yet (e.g. importing app from seed.py).
+        db.session.rollback()
+        names = []
 
-    return [item['strIngredient1'] for item in (resp.json()['drinks'])]
+    return names or [item['strIngredient1'] for item in list_ingredients('i')]
 
 
 def get_random_drinks():
@@ -474,21 +548,68 @@ def get_random_drinks():
     return drinks
 
 
-def get_drinks_by_ingredient(ingredient):
-    """Generate a list of 4 random drinks by ingredient"""
+@api_cache.cached('filter')
+def filter_drinks_by_ingredient(ingredient):
+    """API call for the id/name/thumb of every drink using an ingredient"""
 
     resp = requests.get(
         f"{API_BASE_URL}filter.php?i={ingredient}"
     )
-    if len(resp.json()['drinks']) <= 4:
-        rand_samp = resp.json()['drinks']
+    return resp.json()['drinks']
+
+
+def get_drinks_by_ingredient(ingredient):
+    """Generate a list of 4 random drinks by ingredient"""
+
+    ids = [drink_id for (drink_id,) in
+           (db.session
+            .query(DrinkIngredient.drink_id)
+            .filter(db.func.lower(DrinkIngredient.ingredient) == ingredient.lower())
+            .distinct())]
+
+    if not ids:
+        ids = [int(i['idDrink']) for i in filter_drinks_by_ingredient(ingredient)]
+
+    if len(ids) <= 4:
+        rand_samp = ids
     else:
-        rand_samp = (random.sample(resp.json()['drinks'], 4))
+        rand_samp = (random.sample(ids, 4))
 
-    return [get_drink_by_id(int(i['idDrink'])) for i in rand_samp]
+    return get_drinks_by_ids(rand_samp)
 
 
 def get_ingredient_by_name(ingredient):
+    """Look up ingredient details by name"""
+
+    local = (Ingredient
+             .query
+             .filter(db.func.lower(Ingredient.name) == ingredient.lower())
+             .first())
+
+    return local.data if local else search_ingredient(ingredient)
+
+
+def get_ingredients_by_names(names):
+    """Look up details for many ingredients at once, keeping their order"""
+
+    names = [n for n in names if n]
+    if not names:
+        return []
+
+    local = (Ingredient
+             .query
+             .filter(db.func.lower(Ingredient.name).in_([n.lower() for n in names])))
+    found = {i.name.lower(): i.data for i in local}
+
+    fetched = fetch_many('ingredient', search_ingredient,
+                         [n for n in names if n.lower() not in found])
+    found.update((n.lower(), data) for n, data in fetched.items())
+
+    return [found[n.lower()] for n in names if n.lower() in found]
+
+
+@api_cache.cached('ingredient')
+def search_ingredient(ingredient):
     """API call to search ingredient by name"""
     resp = requests.get(
         f"{API_BASE_URL}search.php?i={ingredient}"
@@ -497,6 +618,26 @@ def get_ingredient_by_name(ingredient):
     return resp.json()['ingredients'][0]
 
 
+def fetch_many(endpoint, helper, args):
+    """Read args through the API cache, fetching every miss concurrently.
+    Returns {arg: payload}; args whose upstream call failed are left out."""
+
+    args = list(dict.fromkeys(args))
+    if not args:
+        return {}
+
+    found = api_cache.get_many(endpoint, args)
+    misses = [a for a in args if a not in found]
+
+    fetched = {a: payload for a, payload in
+               zip(misses, fanout.map(helper.uncached, misses))
+               if payload is not None}
+    api_cache.set_many(endpoint, fetched)
+    found.update(fetched)
+
+    return found
+
+
 INGREDIENTS = get_all_ingredients()
 
 
@@ -541,12 +682,7 @@ def most_recent(usr_id):
     if len(recent) == 0:
         return None
     else:
-        lst = []
-        for drink in recent:
-            resp = get_drink_by_id(drink.drink_id)
-            lst.insert(0, resp)
-
-        return lst
+        return get_drinks_by_ids([drink.drink_id for drink in reversed(recent)])
 
 
 def saved_drk(usr_id, drink):
@@ -587,13 +723,7 @@ def get_saved_drinks(usr_id):
                     .filter(UserDrink.user_id == usr_id)
                     .all())
 
-    lst = []
-
-    for drink in saved_drinks:
-        resp = get_drink_by_id(drink.drink_id)
-        lst.insert(0, resp)
-
-    return lst
+    return get_drinks_by_ids([drink.drink_id for drink in reversed(saved_drinks)])
 
 
 def get_saved_ingredients(usr_id):
@@ -604,13 +734,7 @@ def get_saved_ingredients(usr_id):
                          .filter(UserIngredient.user_id == usr_id)
                          .all())
 
-    lst = []
-
-    for i in saved_ingredients:
-        reps = get_ingredient_by_name(i.ingredient)
-        lst.insert(0, reps)
-
-    return lst
+    return get_ingredients_by_names([i.ingredient for i in reversed(saved_ingredients)])
 
 
 #######################################################################
@@ -642,3 +766,21 @@ def generate_recs(recent, saved_drk, saved_ing):
 
     else:
         return None
+
+
+#######################################################################
+# CLI Commands
+
+
+@app.cli.command('sync-catalog')
+@click.option('--full', is_flag=True,
+              help="Rewrite every drink and ingredient and drop ones removed upstream.")
+def sync_catalog_command(full):
+    """Mirror TheCocktailDB drinks and ingredients into the local tables."""
+
+    counts = sync_catalog(API_BASE_URL, full=full)
+
+    for table, table_counts in counts.items():
+        summary = ", ".join(f"{n} {what}" for what, n in table_counts.items())
+        click.echo(f"{table}: {summary}")
+
@@ -0,0 +1,48 @@
+"""Bounded-concurrency fan-out for upstream API calls."""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class FanOut:
+    """Run one blocking call per item on a shared, size-capped thread pool."""
+
+    def __init__(self, max_workers=8):
+        self.max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self):
+        # Created on first use so each forked worker gets its own threads.
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="fanout")
+            return self._executor
+
+    def map(self, fn, items):
+        """Return [fn(item) ...] in input order; items whose call raised come back as None."""
+
+        items = list(items)
+        if len(items) <= 1:
+            return [self._call(fn, item) for item in items]
+
+        return list(self.executor.map(lambda item: self._call(fn, item), items))
+
+    @staticmethod
+    def _call(fn, item):
+        try:
+            return fn(item)
+        except Exception:
+            logger.exception("fan-out call %s(%r) failed", fn.__name__, item)
+            return None
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
@@ -0,0 +1,238 @@
+"""Two-tier read-through cache for TheCocktailDB responses.
+
+The first tier is a small in-process LRU, the second is the `api_cache`
+table so every gunicorn worker shares (and survives restarts with) the
+same upstream payloads.
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from datetime import datetime, timedelta
+from functools import wraps
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import SQLAlchemyError
+
+from models import db, ApiCacheEntry
+
+logger = logging.getLogger(__name__)
+
+MISSING = object()
+
+# Seconds each kind of upstream response stays fresh.
+DEFAULT_TTLS = {
+    'lookup': 24 * 60 * 60,
+    'ingredient': 24 * 60 * 60,
+    'filter': 6 * 60 * 60,
+    'search': 60 * 60,
+    'list': 24 * 60 * 60,
+}
+
+
+class LRUCache:
+    """Thread-safe, size-bounded LRU where every entry carries its own expiry."""
+
+    def __init__(self, max_size=1024):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        """Return the cached value for key, or MISSING if absent or expired."""
+
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return MISSING
+
+            expires, value = entry
+            if expires <= time.monotonic():
+                del self._data[key]
+                return MISSING
+
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        """Store value for ttl seconds, evicting the least recently used entry if full."""
+
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class TwoTierCache:
+    """Read-through cache: in-process LRU in front of the shared api_cache table."""
+
+    def __init__(self, max_size=1024, ttls=None, db_max_rows=20000, prune_every=100):
+        self.memory = LRUCache(max_size)
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.db_max_rows = db_max_rows
+        self.prune_every = prune_every
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._counts = defaultdict(lambda: {'hits': 0, 'misses': 0})
+
+    def ttl_for(self, endpoint):
+        return self.ttls.get(endpoint, min(self.ttls.values()))
+
+    @staticmethod
+    def make_key(endpoint, arg):
+        return f"{endpoint}:{str(arg).strip().lower()}"
+
+    def _count(self, tier, endpoint, outcome):
+        with self._lock:
+            self._counts[(tier, endpoint)][outcome] += 1
+
+    def stats(self):
+        """Hit/miss counters per tier and endpoint, plus the memory tier size."""
+
+        with self._lock:
+            counts = {f"{tier}.{endpoint}": dict(c)
+                      for (tier, endpoint), c in self._counts.items()}
+
+        return {'memory_size': len(self.memory), 'counts': counts}
+
+    def clear(self):
+        """Drop the in-process tier and reset counters (the shared table is left alone)."""
+
+        self.memory.clear()
+        with self._lock:
+            self._counts.clear()
+
+    ##########################################################################
+    # Lookups
+
+    def get_many(self, endpoint, args):
+        """Return {arg: value} for every arg found in either tier."""
+
+        found = {}
+        keys = {}
+
+        for arg in args:
+            key = self.make_key(endpoint, arg)
+            value = self.memory.get(key)
+            if value is MISSING:
+                self._count('memory', endpoint, 'misses')
+                keys[key] = arg
+            else:
+                self._count('memory', endpoint, 'hits')
+                found[arg] = value
+
+        if keys:
+            for key, value, ttl in self._db_get(list(keys)):
+                self.memory.set(key, value, min(ttl, self.ttl_for(endpoint)))
+                found[keys.pop(key)] = value
+                self._count('db', endpoint, 'hits')
+
+            for _ in keys:
+                self._count('db', endpoint, 'misses')
+
+        return found
+
+    def get(self, endpoint, arg):
+        return self.get_many(endpoint, [arg]).get(arg, MISSING)
+
+    def set_many(self, endpoint, items):
+        """Write {arg: value} through both tiers."""
+
+        ttl = self.ttl_for(endpoint)
+        rows = {}
+
+        for arg, value in items.items():
+            key = self.make_key(endpoint, arg)
+            self.memory.set(key, value, ttl)
+            rows[key] = value
+
+        if rows:
+            self._db_set(rows, ttl)
+
+    def set(self, endpoint, arg, value):
+        self.set_many(endpoint, {arg: value})
+
+    def cached(self, endpoint):
+        """Decorate a single-argument API helper so its result is read through the cache."""
+
+        def decorator(fn):
+            @wraps(fn)
+            def wrapper(arg):
+                value = self.get(endpoint, arg)
+                if value is MISSING:
+                    value = fn(arg)
+                    self.set(endpoint, arg, value)
+                return value
+
+            wrapper.uncached = fn
+            return wrapper
+
+        return decorator
+
+    ##########################################################################
+    # Shared table
+
+    def _db_get(self, keys):
+        table = ApiCacheEntry.__table__
+        now = datetime.utcnow()
+
+        try:
+            with db.engine.connect() as conn:
+                rows = conn.execute(
+                    table.select()
+                    .where(table.c.key.in_(keys))
+                    .where(table.c.expires_at > now)
+                ).fetchall()
+
+        except SQLAlchemyError:
+            logger.exception("api_cache read failed")
+            return []
+
+        return [(r.key, json.loads(r.value), (r.expires_at - now).total_seconds())
+                for r in rows]
+
+    def _db_set(self, rows, ttl):
+        expires_at = datetime.utcnow() + timedelta(seconds=ttl)
+        stmt = insert(ApiCacheEntry.__table__).values([
+            {'key': key, 'value': json.dumps(value), 'expires_at': expires_at}
+            for key, value in rows.items()
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['key'],
+            set_={'value': stmt.excluded.value,
+                  'expires_at': stmt.excluded.expires_at})
+
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % self.prune_every == 0
+
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(stmt)
+                if prune:
+                    self._prune(conn)
+
+        except SQLAlchemyError:
+            logger.exception("api_cache write failed")
+
+    def _prune(self, conn):
+        """Drop expired rows and anything past db_max_rows, soonest-to-expire first."""
+
+        table = ApiCacheEntry.__table__
+        overflow = (db.select([table.c.key])
+                    .order_by(table.c.expires_at.desc())
+                    .offset(self.db_max_rows))
+
+        conn.execute(table.delete().where(db.or_(
+            table.c.expires_at <= datetime.utcnow(),
+            table.c.key.in_(overflow))))
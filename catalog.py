@@ -0,0 +1,173 @@
+"""Mirror TheCocktailDB's catalog into the local drinks and ingredients tables.
+
+Run via `flask sync-catalog`. Incremental runs only rewrite drinks whose
+`dateModified` changed and only fetch ingredient details we don't have yet;
+`--full` rewrites everything and drops drinks that disappeared upstream.
+"""
+
+import logging
+import string
+from datetime import datetime
+
+import requests
+
+from models import db, Drink, Ingredient, DrinkIngredient
+
+logger = logging.getLogger(__name__)
+
+LETTERS = string.ascii_lowercase + string.digits
+MAX_INGREDIENTS = 15
+
+
+def fetch(api_base_url, path):
+    """GET one TheCocktailDB endpoint and return the decoded JSON"""
+
+    resp = requests.get(f"{api_base_url}{path}", timeout=10)
+    resp.raise_for_status()
+    return resp.json()
+
+
+def drink_from_payload(payload):
+    """Build a Drink, with its ordered ingredient rows, from a full drink payload"""
+
+    drink = Drink(
+        id=int(payload['idDrink']),
+        name=payload['strDrink'],
+        category=payload.get('strCategory'),
+        glass=payload.get('strGlass'),
+        thumb=payload.get('strDrinkThumb'),
+        date_modified=payload.get('dateModified'),
+        data=payload,
+        synced_at=datetime.utcnow()
+    )
+
+    for n in range(1, MAX_INGREDIENTS + 1):
+        name = (payload.get(f'strIngredient{n}') or '').strip()
+        if name:
+            drink.ingredients.append(DrinkIngredient(
+                position=n,
+                ingredient=name,
+                measure=payload.get(f'strMeasure{n}')
+            ))
+
+    return drink
+
+
+def ingredient_from_payload(payload):
+    """Build an Ingredient from a search.php?i= payload"""
+
+    return Ingredient(
+        id=int(payload['idIngredient']),
+        name=payload['strIngredient'],
+        data=payload,
+        synced_at=datetime.utcnow()
+    )
+
+
+def replace_drinks(drinks):
+    """Delete and re-insert the given drinks (their ingredient rows cascade)"""
+
+    ids = [d.id for d in drinks]
+    Drink.query.filter(Drink.id.in_(ids)).delete(synchronize_session=False)
+    db.session.add_all(drinks)
+    db.session.commit()
+
+
+def sync_drinks(api_base_url, full=False):
+    """Walk search.php?f=<letter> over the whole catalog; return counts"""
+
+    counts = {'added': 0, 'updated': 0, 'unchanged': 0, 'removed': 0}
+    known = dict(db.session.query(Drink.id, Drink.date_modified).all())
+    seen = set()
+    complete = True
+
+    for letter in LETTERS:
+        try:
+            payloads = fetch(api_base_url, f"search.php?f={letter}")['drinks'] or []
+        except (requests.RequestException, ValueError):
+            logger.exception("catalog sync failed for letter %r", letter)
+            complete = False
+            continue
+
+        changed = []
+        for payload in payloads:
+            drink_id = int(payload['idDrink'])
+            seen.add(drink_id)
+
+            if drink_id not in known:
+                counts['added'] += 1
+            elif full or known[drink_id] != payload.get('dateModified'):
+                counts['updated'] += 1
+            else:
+                counts['unchanged'] += 1
+                continue
+
+            changed.append(drink_from_payload(payload))
+
+        if changed:
+            replace_drinks(changed)
+
+    # Only prune after a clean pass so an upstream outage can't empty the mirror.
+    gone = set(known) - seen
+    if full and complete and seen and gone:
+        Drink.query.filter(Drink.id.in_(gone)).delete(synchronize_session=False)
+        db.session.commit()
+        counts['removed'] = len(gone)
+
+    return counts
+
+
+def sync_ingredients(api_base_url, full=False):
+    """Fetch details for every listed or used ingredient; return counts"""
+
+    counts = {'added': 0, 'updated': 0, 'missing': 0}
+
+    names = {item['strIngredient1'].strip()
+             for item in fetch(api_base_url, "list.php?i=list")['drinks']}
+    names.update(name for (name,) in
+                 db.session.query(DrinkIngredient.ingredient).distinct())
+
+    known = {name.lower(): id for id, name in
+             db.session.query(Ingredient.id, Ingredient.name)}
+
+    for name in sorted(names, key=str.lower):
+        if name.lower() in known and not full:
+            continue
+
+        try:
+            payloads = fetch(api_base_url, f"search.php?i={name}")['ingredients']
+        except (requests.RequestException, ValueError):
+            logger.exception("catalog sync failed for ingredient %r", name)
+            continue
+
+        if not payloads:
+            counts['missing'] += 1
+            continue
+
+        ingredient = ingredient_from_payload(payloads[0])
+        Ingredient.query.filter(db.or_(
+            Ingredient.id == ingredient.id,
+            db.func.lower(Ingredient.name) == ingredient.name.lower()
+        )).delete(synchronize_session=False)
+        db.session.add(ingredient)
+        db.session.commit()
+
+        counts['updated' if name.lower() in known else 'added'] += 1
+        known[ingredient.name.lower()] = ingredient.id
+
+    return counts
+
+
+def sync_catalog(api_base_url, full=False):
+    """Sync drinks, then every ingredient they reference"""
+
+    return {
+        'drinks': sync_drinks(api_base_url, full=full),
+        'ingredients': sync_ingredients(api_base_url, full=full),
+    }
+
+
+def catalog_ready():
+    """True once the local mirror holds at least one drink"""
+
+    return db.session.query(Drink.query.exists()).scalar()
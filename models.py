@@ -289,3 +289,139 @@ class Original(db.Model):
     strMeasure10 = db.Column(
         db.Text
     )
+
+
+class ApiCacheEntry(db.Model):
+    """Cached TheCocktailDB response shared by every app worker"""
+
+    __tablename__ = 'api_cache'
+
+    key = db.Column(
+        db.Text,
+        primary_key=True
+    )
+
+    value = db.Column(
+        db.Text,
+        nullable=False
+    )
+
+    expires_at = db.Column(
+        db.DateTime,
+        nullable=False,
+        index=True
+    )
+
+
+class Drink(db.Model):
+    """Local mirror of a TheCocktailDB drink"""
+
+    __tablename__ = 'drinks'
+
+    id = db.Column(
+        db.Integer,
+        primary_key=True,
+        autoincrement=False
+    )
+
+    name = db.Column(
+        db.Text,
+        nullable=False
+    )
+
+    category = db.Column(
+        db.Text
+    )
+
+    glass = db.Column(
+        db.Text
+    )
+
+    thumb = db.Column(
+        db.Text
+    )
+
+    date_modified = db.Column(
+        db.Text
+    )
+
+    data = db.Column(
+        db.JSON,
+        nullable=False
+    )
+
+    synced_at = db.Column(
+        db.DateTime,
+        nullable=False,
+        default=datetime.utcnow
+    )
+
+    ingredients = db.relationship(
+        "DrinkIngredient",
+        order_by="DrinkIngredient.position",
+        cascade="all,delete-orphan",
+        passive_deletes=True
+    )
+
+
+class Ingredient(db.Model):
+    """Local mirror of a TheCocktailDB ingredient"""
+
+    __tablename__ = 'ingredients'
+
+    id = db.Column(
+        db.Integer,
+        primary_key=True,
+        autoincrement=False
+    )
+
+    name = db.Column(
+        db.Text,
+        nullable=False
+    )
+
+    data = db.Column(
+        db.JSON,
+        nullable=False
+    )
+
+    synced_at = db.Column(
+        db.DateTime,
+        nullable=False,
+        default=datetime.utcnow
+    )
+
+    __table_args__ = (
+        db.Index('ix_ingredients_name', db.func.lower(name), unique=True),
+    )
+
+
+class DrinkIngredient(db.Model):
+    """Ingredient and measure at one position of a mirrored drink's recipe"""
+
+    __tablename__ = 'drink_ingredients'
+
+    drink_id = db.Column(
+        db.Integer,
+        db.ForeignKey("drinks.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+
+    position = db.Column(
+        db.Integer,
+        primary_key=True,
+        autoincrement=False
+    )
+
+    ingredient = db.Column(
+        db.Text,
+        nullable=False
+    )
+
+    measure = db.Column(
+        db.Text
+    )
+
+    __table_args__ = (
+        db.Index('ix_drink_ingredients_ingredient', db.func.lower(ingredient)),
+    )
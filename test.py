@@ -6,8 +6,15 @@
 from app import app
 import os
 from unittest import TestCase
+from unittest.mock import patch
 
 from models import db, connect_db, User, RecentlyViewedDrink, RecentlyViewedIngredient, UserDrink, UserIngredient, Original
+from models import Drink, Ingredient, DrinkIngredient
+from cache import LRUCache, TwoTierCache, MISSING
+from batch import FanOut
+import app as cocktails
+import catalog
+import time
 
 os.environ["DATABASE_URL"] = "postgresql:///cocktails_test"
 
@@ -108,3 +115,198 @@ class UserModelTestCase(TestCase):
         self.assertFalse(User.authenticate(self.u1.username, "badpassword"))
 
 
+class ApiCacheTestCase(TestCase):
+    """Test the two-tier TheCocktailDB cache"""
+
+    def setUp(self):
+        db.drop_all()
+        db.create_all()
+
+        self.cache = TwoTierCache(max_size=2)
+
+    def test_lru_evicts_least_recently_used(self):
+        lru = LRUCache(max_size=2)
+        lru.set("a", 1, 60)
+        lru.set("b", 2, 60)
+        lru.get("a")
+        lru.set("c", 3, 60)
+
+        self.assertEqual(lru.get("a"), 1)
+        self.assertIs(lru.get("b"), MISSING)
+        self.assertEqual(lru.get("c"), 3)
+
+    def test_lru_expires_entries(self):
+        lru = LRUCache()
+        lru.set("a", 1, -1)
+
+        self.assertIs(lru.get("a"), MISSING)
+        self.assertEqual(len(lru), 0)
+
+    def test_read_through(self):
+        calls = []
+
+        @self.cache.cached('lookup')
+        def lookup(drink_id):
+            calls.append(drink_id)
+            return {'idDrink': str(drink_id)}
+
+        self.assertEqual(lookup(11007), {'idDrink': '11007'})
+        self.assertEqual(lookup(11007), {'idDrink': '11007'})
+        self.assertEqual(calls, [11007])
+
+        counts = self.cache.stats()['counts']
+        self.assertEqual(counts['memory.lookup'], {'hits': 1, 'misses': 1})
+        self.assertEqual(counts['db.lookup'], {'hits': 0, 'misses': 1})
+
+    def test_shared_tier_survives_process_cache(self):
+        self.cache.set('ingredient', 'Gin', {'strIngredient': 'Gin'})
+
+        other_worker = TwoTierCache()
+        self.assertEqual(other_worker.get('ingredient', 'gin'),
+                         {'strIngredient': 'Gin'})
+        self.assertEqual(other_worker.stats()['counts']['db.ingredient'],
+                         {'hits': 1, 'misses': 0})
+
+    def test_expired_rows_are_misses(self):
+        cache = TwoTierCache(ttls={'search': -1})
+        cache.set('search', 'margarita', [])
+
+        self.assertIs(TwoTierCache().get('search', 'margarita'), MISSING)
+
+
+def drink_payload(drink_id, name, *ingredients, modified="2021-01-01 00:00:00"):
+    """Build a TheCocktailDB-shaped drink payload"""
+
+    payload = {
+        'idDrink': str(drink_id),
+        'strDrink': name,
+        'strCategory': 'Cocktail',
+        'strGlass': 'Cocktail glass',
+        'strInstructions': f"Mix the {name}.",
+        'strDrinkThumb': f"https://example.com/{drink_id}.jpg",
+        'dateModified': modified,
+    }
+    for n in range(1, 16):
+        payload[f'strIngredient{n}'] = ingredients[n - 1] if n <= len(ingredients) else None
+        payload[f'strMeasure{n}'] = '1 oz' if n <= len(ingredients) else None
+
+    return payload
+
+
+def fake_upstream(drinks, ingredients=("Gin", "Vodka", "Lime juice")):
+    """Stand-in for catalog.fetch serving the given drink payloads"""
+
+    def fetch(api_base_url, path):
+        if path.startswith("search.php?f="):
+            letter = path[-1]
+            return {'drinks': [d for d in drinks
+                               if d['strDrink'].lower().startswith(letter)] or None}
+        if path == "list.php?i=list":
+            return {'drinks': [{'strIngredient1': i} for i in ingredients]}
+        if path.startswith("search.php?i="):
+            name = path.split("=", 1)[1]
+            return {'ingredients': [{'idIngredient': str(abs(hash(name.lower())) % 100000),
+                                     'strIngredient': name,
+                                     'strDescription': f"All about {name}."}]}
+        raise AssertionError(f"unexpected upstream call {path}")
+
+    return fetch
+
+
+class FakeResponse:
+    """Minimal stand-in for a requests.Response"""
+
+    def __init__(self, payload):
+        self.payload = payload
+
+    def json(self):
+        return self.payload
+
+
+class CatalogSyncTestCase(TestCase):
+    """Test mirroring the catalog into local tables"""
+
+    def setUp(self):
+        db.drop_all()
+        db.create_all()
+
+        self.drinks = [
+            drink_payload(1, "Gimlet", "Gin", "Lime juice"),
+            drink_payload(2, "Vodka Gimlet", "Vodka", "Lime juice"),
+        ]
+
+    def tearDown(self):
+        db.session.rollback()
+
+    def test_full_sync(self):
+        with patch.object(catalog, 'fetch', fake_upstream(self.drinks)):
+            counts = catalog.sync_catalog("http://upstream/")
+
+        self.assertEqual(counts['drinks']['added'], 2)
+        self.assertEqual(counts['ingredients']['added'], 3)
+        self.assertEqual(
+            [i.ingredient for i in Drink.query.get(1).ingredients], ["Gin", "Lime juice"])
+
+    def test_incremental_sync_only_rewrites_changed(self):
+        with patch.object(catalog, 'fetch', fake_upstream(self.drinks)):
+            catalog.sync_catalog("http://upstream/")
+
+        self.drinks[0] = drink_payload(1, "Gimlet", "Gin", "Lime cordial",
+                                       modified="2021-06-01 00:00:00")
+        with patch.object(catalog, 'fetch', fake_upstream(self.drinks)):
+            counts = catalog.sync_catalog("http://upstream/")
+
+        self.assertEqual(counts['drinks'],
+                         {'added': 0, 'updated': 1, 'unchanged': 1, 'removed': 0})
+        self.assertEqual(counts['ingredients']['added'], 1)
+        self.assertEqual(Drink.query.get(1).data['strIngredient2'], "Lime cordial")
+
+    def test_helpers_read_local_tables(self):
+        with patch.object(catalog, 'fetch', fake_upstream(self.drinks)):
+            catalog.sync_catalog("http://upstream/")
+
+        with patch('requests.get', side_effect=AssertionError("network")):
+            self.assertEqual(cocktails.get_drink_by_id(2)['strDrink'], "Vodka Gimlet")
+            self.assertEqual(cocktails.get_ingredient_by_name("gin")['strIngredient'], "Gin")
+            self.assertEqual([d['strDrink'] for d in cocktails.get_drinks_by_name("gim")],
+                             ["Gimlet", "Vodka Gimlet"])
+            self.assertEqual(sorted(d['idDrink'] for d in cocktails.get_drinks_by_ingredient("lime juice")),
+                             ['1', '2'])
+
+
+class FanOutTestCase(TestCase):
+    """Test concurrent multi-item fetches"""
+
+    def setUp(self):
+        db.drop_all()
+        db.create_all()
+        cocktails.api_cache.clear()
+
+    def test_map_is_concurrent_and_ordered(self):
+        def slow_double(n):
+            time.sleep(0.2)
+            if n == 3:
+                raise ValueError("upstream hiccup")
+            return n * 2
+
+        start = time.perf_counter()
+        results = FanOut(max_workers=8).map(slow_double, range(8))
+
+        self.assertLess(time.perf_counter() - start, 0.6)
+        self.assertEqual(results, [0, 2, 4, None, 8, 10, 12, 14])
+
+    def test_get_drinks_by_ids_mixes_local_and_upstream(self):
+        db.session.add(catalog.drink_from_payload(drink_payload(1, "Gimlet", "Gin")))
+        db.session.commit()
+
+        def upstream(url, *args, **kwargs):
+            drink_id = int(url.rsplit("=", 1)[1])
+            if drink_id == 3:
+                raise ConnectionError("upstream down")
+            return FakeResponse({'drinks': [drink_payload(drink_id, f"Drink {drink_id}")]})
+
+        with patch('requests.get', side_effect=upstream):
+            drinks = cocktails.get_drinks_by_ids([2, 1, 3, 4])
+
+        self.assertEqual([d['idDrink'] for d in drinks], ['2', '1', '4'])
+